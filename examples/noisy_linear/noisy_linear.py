@@ -12,29 +12,42 @@
 * No apply method
 * No need special versions of `vmap`, `jit`, and friends.
 
+**Note**: when running on TPU this example enables JAX's persistent compilation cache at `/tmp/jax_cache`, after a first run pre-warms the cache subsequent runs reuse the compiled programs instead of compiling them again.
+
 We will showcase each of the above features by creating a very contrived but complete module that will use everything from parameters, states, and random states:
 """
 
 # %%
 import typing as tp
 
+import jax
 import jax.numpy as jnp
 import numpy as np
 
 
 import treex as tx
 
+# on TPU cache compiled XLA programs on disk so later runs skip compilation,
+# in jax 0.2.x the persistent cache is not used on other backends
+if jax.default_backend() == "tpu":
+    from jax.experimental.compilation_cache import compilation_cache as cc
+
+    if not cc.is_initialized():
+        cc.initialize_cache("/tmp/jax_cache")
+
 
 class NoisyLinear(tx.Module):
     # tree parts are defined by treex annotations
     w: tp.Union[jnp.ndarray, tx.Initializer] = tx.Parameter.node()
     b: tp.Union[jnp.ndarray, tx.Initializer] = tx.Parameter.node()
     key: tp.Union[jnp.ndarray, tx.Initializer] = tx.Rng.node()
+    step: jnp.ndarray = tx.State.node()
 
     # other annotations are possible but ignored by type
     name: str
+    dtype: tp.Any
 
-    def __init__(self, din, dout):
+    def __init__(self, din, dout, dtype=jnp.float32):
 
         # Initializers only expect RNG key
         self.w = tx.Initializer(lambda k: jax.random.uniform(k, shape=(din, dout)))
@@ -42,21 +55,33 @@ class NoisyLinear(tx.Module):
 
         # random state is JUST state, we can keep it locally
         self.key = tx.Initializer(lambda k: k)
+        self.step = jnp.array(0, dtype=jnp.uint32)
+
+        # parameters are kept in float32, the computation runs in `dtype`
+        self.dtype = dtype
 
     def __call__(self, x: np.ndarray) -> np.ndarray:
         assert isinstance(self.key, jnp.ndarray)
 
-        # update state in place
-        key, self.key = jax.random.split(self.key, 2)
+        # derive a fresh key from the step count and update state in place
+        key = jax.random.fold_in(self.key, self.step)
+        self.step = self.step + 1
 
         # your typical linear operation
-        y = jnp.dot(x, self.w) + self.b
+        x = jnp.asarray(x, self.dtype)
+        y = jnp.dot(x, self.w.astype(self.dtype)) + self.b.astype(self.dtype)
 
         # add noise for fun
-        return y + 0.8 * jax.random.normal(key, shape=y.shape)
+        noise = jax.random.normal(key, shape=y.shape, dtype=y.dtype)
+        y = y + noise * jnp.asarray(0.8, y.dtype)
+
+        return y.astype(jnp.float32)
 
 
-model = NoisyLinear(1, 1)
+# use bfloat16 for the computation on accelerators
+dtype = jnp.float32 if jax.default_backend() == "cpu" else jnp.bfloat16
+
+model = NoisyLinear(1, 1, dtype=dtype)
 
 print(model)
 
@@ -118,20 +143,14 @@ Next, we will implement the `update` function, it will look indistinguishable fr
 
 # %%
 @jax.jit
-def train_step(model: NoisyLinear, optimizer: tx.Optimizer, x, y):
-    # select Parameters
-    params = model.filter(tx.Parameter)
-
+def train_step(params: NoisyLinear, model: NoisyLinear, optimizer: tx.Optimizer, x, y):
     # call loss_fn to get loss, model state, and gradients
     (loss, model), grads = loss_fn(params, model, x, y)
 
     # apply optax update
-    new_params = optimizer.update(grads, params)
-
-    # update new_params
-    model = model.merge(new_params)
+    params = optimizer.update(grads, params)
 
-    return model, optimizer, loss
+    return params, model, optimizer, loss
 
 
 # %% [markdown]
@@ -147,19 +166,15 @@ np.random.seed(0)
 
 
 def get_data(dataset_size: int) -> tp.Tuple[np.ndarray, np.ndarray]:
-    x = np.random.normal(size=(dataset_size, 1))
-    y = 5 * x - 2 + 0.4 * np.random.normal(size=(dataset_size, 1))
+    x = np.random.normal(size=(dataset_size, 1)).astype(np.float32, copy=False)
+    noise = np.random.normal(size=(dataset_size, 1)).astype(np.float32, copy=False)
+    y = 5 * x - 2 + 0.4 * noise
     return x, y
 
 
-def get_batch(
-    data: tp.Tuple[np.ndarray, np.ndarray], batch_size: int
-) -> tp.Tuple[np.ndarray, np.ndarray]:
-    idx = np.random.choice(len(data[0]), batch_size)
-    return jax.tree_map(lambda x: x[idx], data)
-
-
-data = get_data(1000)
+# move the dataset to the device once
+x, y = get_data(1000)
+data = jnp.asarray(x), jnp.asarray(y)
 
 fig = plt.figure()  # __st
 plt.scatter(data[0], data[1])
@@ -169,19 +184,60 @@ fig  # __st
 
 # %% [markdown]
 """
-Finally, we create a simple training loop that performs a few thousand updates and update `params` and `states` back into a single `model` at the end:
+Finally, we create a training loop that performs a few thousand updates. Since modules are pytrees the whole loop can be compiled with `jax.lax.scan`, carrying `(params, states, optimizer)` and merging them back into a single `model` only at the end. The data is moved to the device once and all batch indices are drawn up front, so each step only gathers its batch on-device:
 """
 
 # %%
 steps = 10_000
+batch_size = 32
+
+data_x, data_y = data
+
+
+# buffer donation is not implemented on CPU, only donate on accelerators
+@partial(jax.jit, donate_argnums=() if jax.default_backend() == "cpu" else (0, 1, 2))
+def train(
+    params: NoisyLinear,
+    states: NoisyLinear,
+    optimizer: tx.Optimizer,
+    key: jnp.ndarray,
+):
+    def body(carry, idx):
+        params, states, optimizer = carry
+
+        # gather the batch on-device
+        x, y = data_x[idx], data_y[idx]
+
+        params, model, optimizer, loss = train_step(params, states, optimizer, x, y)
+
+        # the body is traced once, this filter adds no per-step work
+        states = model.filter(tx.State)
+
+        return (params, states, optimizer), loss
+
+    # draw the indices for all batches at once
+    idxs = jax.random.randint(key, (steps, batch_size), 0, len(data_x))
+
+    (params, states, optimizer), losses = jax.lax.scan(
+        body, (params, states, optimizer), idxs
+    )
+
+    return states.merge(params), optimizer, losses
+
+
+key = jax.random.PRNGKey(0)
+states = model.filter(tx.State)
+
+# warmup: trace and compile ahead of time so compilation is not part of the run
+train = train.lower(params, states, optimizer, key).compile()
 
-for step in range(steps):
-    x, y = get_batch(data, batch_size=32)
+model, optimizer, losses = train(params, states, optimizer, key)
 
-    model, optimizer, loss = train_step(model, optimizer, x, y)
+# sync once: copy all losses to the host in a single transfer
+losses = np.asarray(losses.block_until_ready())
 
-    if step % 1000 == 0:
-        print(f"[{step}] loss = {loss}")
+for step in range(0, steps, 1000):
+    print(f"[{step}] loss = {losses[step]}")
 
 # %% [markdown]
 """
@@ -42,7 +42,7 @@ def sdg(param, grad):
 # training loop
 for step in range(10_000):
     grads = loss_fn(model, x, y)
-    model = jax.tree_map(sdg, model, grads)
+    model = jax.tree_util.tree_map(sdg, model, grads)
 
 model = model.eval()
 preds = model(x)
@@ -1,5 +1,5 @@
 from functools import partial
-from typing import Union
+from typing import Any, Union
 
 import jax
 import jax.numpy as jnp
@@ -9,27 +9,41 @@ import optax
 
 import treex as tx
 
+# on TPU cache compiled XLA programs on disk so later runs skip compilation,
+# in jax 0.2.x the persistent cache is not used on other backends
+if jax.default_backend() == "tpu":
+    from jax.experimental.compilation_cache import compilation_cache as cc
+
+    if not cc.is_initialized():
+        cc.initialize_cache("/tmp/jax_cache")
+
 x = jnp.array([[0, 0], [0, 1], [1, 0], [1, 1]], dtype=jnp.float32)
 y = jnp.array([0, 1, 1, 0], dtype=jnp.float32)[:, None]
 
+# compute in bfloat16 on accelerators, parameters are kept in float32
+dtype = jnp.float32 if jax.default_backend() == "cpu" else jnp.bfloat16
+
 # treex already defines tx.Linear but we can define our own
 class Linear(tx.Module):
     w: Union[tx.Initializer, jnp.ndarray] = tx.Parameter.node()
     b: jnp.ndarray = tx.Parameter.node()
+    dtype: Any
 
-    def __init__(self, din, dout):
+    def __init__(self, din, dout, dtype=jnp.float32):
         self.w = tx.Initializer(lambda key: jax.random.uniform(key, shape=(din, dout)))
         self.b = jnp.zeros(shape=(dout,))
+        self.dtype = dtype
 
     def __call__(self, x):
-        return jnp.dot(x, self.w) + self.b
+        x = jnp.asarray(x, self.dtype)
+        return jnp.dot(x, self.w.astype(self.dtype)) + self.b.astype(self.dtype)
 
 
 class CustomMLP(tx.Module):
-    def __init__(self, din, dhid, dout):
+    def __init__(self, din, dhid, dout, dtype=jnp.float32):
 
-        self.l1 = Linear(din, dhid)
-        self.l2 = Linear(dhid, dout)
+        self.l1 = Linear(din, dhid, dtype=dtype)
+        self.l2 = Linear(dhid, dout, dtype=dtype)
 
     def __call__(self, x):
         x = self.l1(x)
@@ -38,21 +52,29 @@ class CustomMLP(tx.Module):
         return x
 
 
-model = CustomMLP(2, 16, 1).init(42)
+model = CustomMLP(2, 16, 1, dtype=dtype).init(42)
 optimizer = tx.Optimizer(optax.adam(0.01))
 optimizer = optimizer.init(model.filter(tx.Parameter))
 
 
 @jax.value_and_grad
 def loss_fn(model, x, y):
-    preds = model(x)
+    preds = model(x).astype(jnp.float32)
     loss = optax.sigmoid_binary_cross_entropy(preds, y).mean()
     return loss
 
 
-@jax.jit
-def train_step(model, x, y, optimizer: tx.Optimizer):
-    loss, grads = loss_fn(model, x, y)
+# tile the 4 XOR rows into a batch of 1024 so each step does a meaningful amount of
+# work, the mean loss and its gradient are unchanged
+x_train = jnp.tile(x, (256, 1))
+y_train = jnp.tile(y, (256, 1))
+
+
+# the training data is constant so it is captured by train_step instead of passed in
+# buffer donation is not implemented on CPU, only donate on accelerators
+@partial(jax.jit, donate_argnums=() if jax.default_backend() == "cpu" else (0, 1))
+def train_step(model, optimizer: tx.Optimizer):
+    loss, grads = loss_fn(model, x_train, y_train)
 
     # here model == params
     model = optimizer.update(grads, model)
@@ -60,15 +82,23 @@ def train_step(model, x, y, optimizer: tx.Optimizer):
     return loss, model, optimizer
 
 
+# warmup: trace and compile ahead of time so compilation is not part of the loop
+train_step = train_step.lower(model, optimizer).compile()
+
 for step in range(1000):
-    loss, model, optimizer = train_step(model, x, y, optimizer)
+    loss, model, optimizer = train_step(model, optimizer)
     if step % 100 == 0:
         print(f"loss: {loss:.4f}")
 
+
+@jax.jit
+def predict(model, x):
+    return (model(x) > 0).astype(jnp.int32)
+
+
 model = model.eval()
 
-preds = model(x)
-preds = (preds > 0).astype(np.int32)
+preds = np.asarray(predict(model, x))
 
 print(preds)
 
@@ -93,3 +93,112 @@ class TestCrossentropy:
                 bce_tfk(target, preds),
                 rtol=0.0001,
             )
+
+    def test_sparse_uint8_target(self):
+        target = np.random.randint(0, 10, size=(2, 256, 256)).astype(np.uint8)
+        preds = np.random.random([2, 256, 256, 10]).astype(np.float32)
+
+        loss_treex = tx.losses.crossentropy(target, preds, from_logits=True)
+        loss_tfk = tf.keras.losses.sparse_categorical_crossentropy(
+            target, preds, from_logits=True
+        )
+
+        assert np.allclose(loss_treex, loss_tfk, rtol=1e-4, atol=1e-5)
+
+    def test_sparse_bfloat16_large_logits(self):
+        target = jnp.array([0, 1, 2])
+        preds = jnp.array(
+            [[100.0, 99.0, 98.0], [-100.0, -101.0, -99.0], [200.0, 200.0, 199.0]]
+        )
+
+        loss_f32 = tx.losses.crossentropy(target, preds, from_logits=True)
+        loss_bf16 = tx.losses.crossentropy(
+            target, preds.astype(jnp.bfloat16), from_logits=True
+        )
+
+        assert loss_bf16.dtype == jnp.bfloat16
+        assert np.all(np.asarray(loss_bf16, np.float32) > 0.0)
+        assert np.allclose(np.asarray(loss_bf16, np.float32), loss_f32, rtol=1e-2)
+
+    def test_sparse_check_bounds_large_unsigned(self):
+        target = jnp.array([0, 0xFFFFFFFF], dtype=jnp.uint32)
+        preds = jnp.array([[0.6, 0.4], [0.4, 0.6]])
+
+        loss = tx.losses.crossentropy(target, preds)
+
+        assert np.isfinite(loss[0])
+        assert np.isnan(loss[1])
+
+    @pytest.mark.parametrize("from_logits", [True, False])
+    def test_sparse_check_bounds(self, from_logits):
+        preds = jnp.array([[0.6, 0.4], [0.4, 0.6], [0.5, 0.5]])
+
+        # negative int32 target
+        target = jnp.array([0, -1, 1], dtype=jnp.int32)
+        loss = tx.losses.crossentropy(target, preds, from_logits=from_logits)
+        assert np.all(np.isfinite(loss[[0, 2]]))
+        assert np.isnan(loss[1])
+
+        # target larger/equal to n_classes
+        target = jnp.array([0, 2, 1], dtype=jnp.int32)
+        loss = tx.losses.crossentropy(target, preds, from_logits=from_logits)
+        assert np.all(np.isfinite(loss[[0, 2]]))
+        assert np.isnan(loss[1])
+
+        # uint8 target larger/equal to n_classes
+        target = jnp.array([0, 7, 1], dtype=jnp.uint8)
+        loss = tx.losses.crossentropy(target, preds, from_logits=from_logits)
+        assert np.all(np.isfinite(loss[[0, 2]]))
+        assert np.isnan(loss[1])
+
+        # disabled check
+        target = jnp.array([0, -1, 2], dtype=jnp.int32)
+        loss = tx.losses.crossentropy(
+            target, preds, from_logits=from_logits, check_bounds=False
+        )
+        assert np.all(np.isfinite(loss))
+
+    @pytest.mark.parametrize("kwargs", [dict(label_smoothing=0.1), dict(binary=True)])
+    def test_sparse_check_bounds_one_hot_fallback(self, kwargs):
+        target = jnp.array([0, -1, 2])
+        preds = jnp.array([[0.6, 0.4], [0.4, 0.6], [0.5, 0.5]])
+
+        loss = tx.losses.crossentropy(target, preds, **kwargs)
+        assert np.isfinite(loss[0])
+        assert np.all(np.isnan(loss[1:]))
+
+        loss = tx.losses.crossentropy(target, preds, check_bounds=False, **kwargs)
+        assert np.all(np.isfinite(loss))
+
+    def test_traced_inputs(self):
+        target = jnp.array([1, 0])
+        preds = jnp.array([[0.6, 0.4], [0.4, 0.6]])
+        loss_fn = tx.losses.Crossentropy()
+        expected = loss_fn(target=target, preds=preds)
+
+        loss_jit = jax.jit(lambda t, p: loss_fn(target=t, preds=p))(target, preds)
+        grads = jax.grad(lambda p: loss_fn(target=target, preds=p))(preds)
+        loss_vmap = jax.vmap(lambda t, p: loss_fn(target=t, preds=p))(
+            target[:, None], preds[:, None]
+        )
+
+        assert np.isclose(loss_jit, expected)
+        assert grads.shape == preds.shape
+        assert np.all(np.isfinite(grads))
+        assert np.isclose(loss_vmap.mean(), expected)
+
+    def test_repeated_calls(self):
+        target = jnp.array([1, 0])
+        preds = jnp.array([[0.6, 0.4], [0.4, 0.6]])
+        expected = tx.losses.crossentropy(target, preds).mean()
+
+        # repeated calls on the same or new instances and with new shapes agree
+        # with the functional version
+        for loss_fn in [tx.losses.Crossentropy(), tx.losses.Crossentropy()]:
+            for _ in range(2):
+                assert np.isclose(loss_fn(target=target, preds=preds), expected)
+
+            assert np.isclose(
+                loss_fn(target=jnp.tile(target, 3), preds=jnp.tile(preds, (3, 1))),
+                expected,
+            )
@@ -12,6 +12,8 @@ import pytest
 
 import treex as tx
 
+_RNG = np.random.default_rng(0)
+
 
 class Linear(tx.Module):
     w: np.ndarray = tx.Parameter.node()
@@ -22,8 +24,8 @@ class Linear(tx.Module):
 
         self.din = din
         self.dout = dout
-        self.w = np.random.uniform(size=(din, dout))
-        self.b = np.random.uniform(size=(dout,))
+        self.w = _RNG.uniform(size=(din, dout))
+        self.b = _RNG.uniform(size=(dout,))
         self.n = 1
         self.name = name
 
@@ -165,7 +167,7 @@ class TestTreex:
         assert not isinstance(mlp_next.linear2.n, tx.Nothing)
 
     def test_update_initializers(self):
-        x = np.random.uniform(size=(5, 2))
+        x = _RNG.uniform(size=(5, 2))
         m = tx.Linear(3)
         m2 = m.init(42, x)
 
@@ -216,8 +218,8 @@ class TestTreex:
                 self.din = din
                 self.dout = dout
                 self.params = [
-                    np.random.uniform(size=(din, dout)),
-                    np.random.uniform(size=(dout,)),
+                    _RNG.uniform(size=(din, dout)),
+                    _RNG.uniform(size=(dout,)),
                 ]
                 self.name = name
 
@@ -364,7 +366,7 @@ class TestTreex:
             def __call__(self, x):
                 return self.linear2(self.linear1(x))
 
-        x = np.random.uniform(size=(2, 3))
+        x = _RNG.uniform(size=(2, 3))
         mlp = MLP(2, 3, 5).init(42, x)
 
     def test_repr(self):
@@ -397,10 +399,11 @@ class TestTreex:
 
             def __init__(self):
 
-                self.a = {"mlps": [MLP(256, 1024, 512), MLP(256, 1024, 512)]}
+                # tabulate only needs the structure, keep the weights small
+                self.a = {"mlps": [MLP(16, 32, 8), MLP(16, 32, 8)]}
                 self.b = [
-                    tx.Initializer(lambda key: jnp.zeros((512, 256))),
-                    jnp.zeros((512, 128)),
+                    tx.Initializer(lambda key: jnp.zeros((8, 16))),
+                    jnp.zeros((8, 4)),
                 ]
 
         mlp = MyModule()  # .init(42)
@@ -438,14 +441,14 @@ class TestTreex:
 
                 return dict(y1=y1, y2=y2)
 
-        x = np.random.uniform(size=(5, 1))
+        x = _RNG.uniform(size=(5, 1))
         mlp = MyModule().init(42, x)
         mlp = jax.tree_map(
             lambda x: jnp.asarray(x) if not isinstance(x, tx.Initializer) else x, mlp
         )
         # mlp = mlp.filter(tx.Parameter)
 
-        x = np.random.uniform(size=(5, 1))
+        x = _RNG.uniform(size=(5, 1))
 
         rep = mlp.tabulate(inputs=tx.Inputs(x))
 
@@ -469,7 +472,7 @@ class TestTreex:
                 x = self.a(x)
                 return x
 
-        x = np.random.uniform(size=(5, 4))
+        x = _RNG.uniform(size=(5, 4))
         mod = Mod().init(42, x)
 
         assert len(jax.tree_leaves(mod)) == 2
@@ -1,7 +1,9 @@
+import functools
 import typing as tp
 
 import jax
 import jax.numpy as jnp
+import jax.scipy.special
 import optax
 
 from treex import types, utils
@@ -17,6 +19,84 @@ def smooth_labels(
     return smooth_positives * target + smooth_negatives
 
 
+def _take_target(preds: jnp.ndarray, target: jnp.ndarray) -> jnp.ndarray:
+    # int32 indices are natively supported by accelerator gathers
+    idx = target.astype(jnp.int32)
+
+    if preds.ndim == 2:
+        return preds[jnp.arange(preds.shape[0]), idx]
+    else:
+        return jnp.take_along_axis(preds, idx[..., None], axis=-1).squeeze(-1)
+
+
+def _check_bounds(
+    target: jnp.ndarray, loss: jnp.ndarray, n_classes: int
+) -> jnp.ndarray:
+    # set NaN where target is negative or larger/equal to the number of preds channels,
+    # comparisons run in the target's own dtype so large unsigned labels don't wrap
+    if (
+        jnp.issubdtype(target.dtype, jnp.integer)
+        and n_classes > jnp.iinfo(target.dtype).max
+    ):
+        # no value of this dtype can be larger/equal to n_classes
+        invalid = jnp.zeros(target.shape, dtype=bool)
+    else:
+        invalid = target >= jnp.asarray(n_classes, dtype=target.dtype)
+
+    # unsigned targets can't be negative, skip the check at trace time
+    if not jnp.issubdtype(target.dtype, jnp.unsignedinteger):
+        invalid = jnp.logical_or(invalid, target < 0)
+
+    return jnp.where(invalid, jnp.nan, loss)
+
+
+def _sparse_crossentropy_logits_row(
+    target: jnp.ndarray, preds: jnp.ndarray
+) -> jnp.ndarray:
+    # reduce and subtract in at least float32 (e.g. for bfloat16 preds) to avoid
+    # cancellation, only the per-row result is cast back to preds.dtype
+    acc = jnp.promote_types(preds.dtype, jnp.float32)
+    lse = jax.scipy.special.logsumexp(preds.astype(acc))
+    return (lse - preds[target].astype(acc)).astype(preds.dtype)
+
+
+@functools.partial(jax.jit, static_argnames=("check_bounds",))
+def _sparse_crossentropy_logits(
+    target: jnp.ndarray,
+    preds: jnp.ndarray,
+    check_bounds: bool,
+) -> jnp.ndarray:
+    n_classes = preds.shape[-1]
+
+    # only the target entry of log_softmax is needed, this avoids materializing it,
+    # vectorizing over rows lets XLA fuse the reduction and the gather per row
+    loss = jnp.vectorize(_sparse_crossentropy_logits_row, signature="(),(c)->()")(
+        target.astype(jnp.int32), preds
+    )
+
+    if check_bounds:
+        loss = _check_bounds(target, loss, n_classes)
+
+    return loss
+
+
+@functools.partial(jax.jit, static_argnames=("check_bounds",))
+def _sparse_crossentropy_probs(
+    target: jnp.ndarray,
+    preds: jnp.ndarray,
+    check_bounds: bool,
+) -> jnp.ndarray:
+    n_classes = preds.shape[-1]
+
+    probs = _take_target(preds, target)
+    loss = -jnp.log(probs + types.EPSILON)
+
+    if check_bounds:
+        loss = _check_bounds(target, loss, n_classes)
+
+    return loss
+
+
 def crossentropy(
     target: jnp.ndarray,
     preds: jnp.ndarray,
@@ -28,12 +108,26 @@ def crossentropy(
 ) -> jnp.ndarray:
 
     n_classes = preds.shape[-1]
+    sparse_target = None
 
     if target.ndim == preds.ndim - 1:
         if target.shape != preds.shape[:-1]:
             raise ValueError(
                 f"Target shape '{target.shape}' does not match preds shape '{preds.shape}'"
             )
+
+        if not binary and label_smoothing is None:
+            # gather the target class directly instead of building one-hot targets
+            if from_logits:
+                return _sparse_crossentropy_logits(
+                    target, preds, check_bounds=check_bounds
+                )
+            else:
+                return _sparse_crossentropy_probs(
+                    target, preds, check_bounds=check_bounds
+                )
+
+        sparse_target = target
         target = jax.nn.one_hot(target, n_classes)
     else:
         if target.ndim != preds.ndim:
@@ -59,15 +153,19 @@ def crossentropy(
         else:
             loss = -(target * jnp.log(preds)).sum(axis=-1)
 
-    # TODO: implement check_bounds
-    # if check_bounds:
-    #     # set NaN where target is negative or larger/equal to the number of preds channels
-    #     loss = jnp.where(target < 0, jnp.nan, loss)
-    #     loss = jnp.where(target >= n_classes, jnp.nan, loss)
+    if check_bounds and sparse_target is not None:
+        loss = _check_bounds(sparse_target, loss, n_classes)
 
     return loss
 
 
+# shared by all `Crossentropy` instances, inlined when called under an outer trace
+_crossentropy_jit = jax.jit(
+    crossentropy,
+    static_argnames=("binary", "from_logits", "label_smoothing", "check_bounds"),
+)
+
+
 class Crossentropy(Loss):
     """
     Computes the crossentropy loss between the target and predictions.
@@ -188,8 +286,7 @@ class Crossentropy(Loss):
         Returns:
             Loss values per sample.
         """
-
-        return crossentropy(
+        return _crossentropy_jit(
             target,
             preds,
             binary=self._binary,